@@ -5,10 +5,20 @@ Supports: Local Transformers, OpenRouter, Google Gemini, DeepSeek
 """
 
 import frappe
+import hashlib
 import os
 import json
+import orjson
+import queue
 import requests
 import re
+import shutil
+import tempfile
+import threading
+import time
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+from urllib3.util.retry import Retry
 
 # Try to import transformers, but don't fail if it's not installed
 try:
@@ -18,9 +28,33 @@ except ImportError:
     TRANSFORMERS_AVAILABLE = False
     # Warning will be logged when AI is actually used
 
+# ONNX Runtime (via Hugging Face Optimum) is optional - used for faster CPU inference when installed
+try:
+    from optimum.onnxruntime import ORTModelForCausalLM
+    OPTIMUM_AVAILABLE = True
+except ImportError:
+    OPTIMUM_AVAILABLE = False
+
 # Global model cache
 _model_cache = None
 _model_name = "facebook/opt-125m"  # Small, fast model (125M parameters, ~250MB)
+_generation_kwargs = None  # Fixed generate() arguments, built once the model is loaded
+_model_load_lock = threading.Lock()  # One load per process, whether preloaded or on first use
+_preload_started = False
+
+# Local generations are queued and run in batches by a background thread
+GENERATION_MAX_BATCH = 8
+GENERATION_TIMEOUT = 120  # seconds a request waits for its batch
+_generation_queue = queue.Queue()
+_generation_thread = None
+_generation_thread_lock = threading.Lock()
+
+# Per-site cache of Chatnext Settings and its decrypted API keys
+_settings_cache = {}
+SETTINGS_CACHE_TTL = 30  # seconds
+
+# Redis key for the AI on/off flag, shared by all workers (dropped when settings are saved)
+AI_ENABLED_CACHE_KEY = "chatnext:ai_enabled"
 
 # API Endpoints
 OPENROUTER_API_URL = "https://openrouter.ai/api/v1/chat/completions"
@@ -28,45 +62,204 @@ GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini
 DEEPSEEK_API_URL = "https://api.deepseek.com/v1/chat/completions"
 OLLAMA_API_URL = "http://localhost:11434/api/generate"
 
+# Upper bound on how long a request worker waits for a streamed Ollama answer
+OLLAMA_GENERATION_TIMEOUT = 180  # seconds
+
+# Upper bound on the KB context sent with each AI prompt
+MAX_CONTEXT_LENGTH = 1500  # characters
+
+# Cached AI answers, keyed on question + KB context + language + provider
+AI_RESPONSE_CACHE_TTL = 3600  # seconds
+
+# Prompt fragments shared by the API callers
+PLAIN_TEXT_INSTRUCTION = "Always respond in plain text without markdown formatting (no **, ###, ---, or bullet points)."
+SYSTEM_PROMPT = f"You are a helpful ERPNext assistant. {PLAIN_TEXT_INSTRUCTION}"
+SYSTEM_MESSAGE = {"role": "system", "content": SYSTEM_PROMPT}
+GEMINI_PROMPT_TEMPLATE = (
+    "Context: {context}\n\nQuestion: {question}\n\n"
+    "Provide a helpful answer for ERPNext users in plain text without any markdown formatting "
+    "(no **, ###, ---, or bullet points). Use simple paragraphs only."
+)
+OLLAMA_PROMPT_HEAD = f"{SYSTEM_PROMPT}\n\n"
+
+# Shared HTTP session - keeps connections (and TLS sessions) to the AI providers alive
+_http_session = requests.Session()
+_http_adapter = HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=20,
+    # Provider calls are all POSTs, which urllib3 does not retry by default.
+    # Read errors are not retried: the provider may already have done the work.
+    max_retries=Retry(
+        total=2,
+        read=0,
+        backoff_factor=0.3,
+        status_forcelist=[502, 503, 504],
+        allowed_methods=None
+    )
+)
+_http_session.mount("https://", _http_adapter)
+_http_session.mount("http://", _http_adapter)
+# Ask for compressed responses in every encoding urllib3 can decode here (br once brotli is installed)
+_http_session.headers.update({
+    "Content-Type": "application/json",
+    "Accept-Encoding": ACCEPT_ENCODING
+})
+
+
+# Line-level markdown markers: horizontal rules, or a run of stacked
+# header / bullet / number prefixes ("### 1. Title", "- 1. item")
+_LINE_MARKDOWN_RE = re.compile(
+    r'^(?:[\-\*_]{3,}[ \t]*$|(?:[ \t]*(?:#{1,6}|[\-\*]|\d+\.)[ \t]+)+)',
+    re.MULTILINE
+)
+
+# Inline markdown: bold, italic, inline code, links - plus runs of blank lines.
+# Every alternative has exactly one group, holding the text to keep.
+_INLINE_MARKDOWN_RE = re.compile(
+    r'\*\*\*(.+?)\*\*\*'          # ***bold italic***
+    r'|___(.+?)___'               # ___bold italic___
+    r'|\*\*(.+?)\*\*'             # **bold**
+    r'|__(.+?)__'                 # __bold__
+    r'|\*(.+?)\*'                 # *italic*
+    r'|_(.+?)_'                   # _italic_
+    r'|`([^`]+)`'                 # `code`
+    r'|\[([^\]]+)\]\([^\)]+\)'     # [text](url)
+    r'|(\n\n)\n+'                 # 3+ newlines -> 2
+)
+
+# Cheap check for anything the two passes above could rewrite
+_MARKDOWN_SNIFF_RE = re.compile(r'[*_#`\[|]|---|\n\n\n|^\s*(?:-|\d+\.)\s', re.MULTILINE)
+
+
+def _strip_inline_markdown(match):
+    """Keep the captured text of an inline markdown match, stripping nested markers"""
+    inner = match.group(match.lastindex)
+    if match.lastindex == match.re.groups:
+        return inner
+    return _INLINE_MARKDOWN_RE.sub(_strip_inline_markdown, inner)
+
 
 def remove_markdown_formatting(text):
     """Remove markdown formatting from text to make it plain"""
     if not text:
         return text
 
-    # Remove headers (### Header -> Header)
-    text = re.sub(r'^#{1,6}\s+', '', text, flags=re.MULTILINE)
+    # Most responses are already plain text
+    if not _MARKDOWN_SNIFF_RE.search(text):
+        return text.strip()
 
-    # Remove bold (**text** or __text__ -> text)
-    text = re.sub(r'\*\*(.+?)\*\*', r'\1', text)
-    text = re.sub(r'__(.+?)__', r'\1', text)
+    text = _LINE_MARKDOWN_RE.sub('', text)
 
-    # Remove italic (*text* or _text_ -> text)
-    text = re.sub(r'\*(.+?)\*', r'\1', text)
-    text = re.sub(r'_(.+?)_', r'\1', text)
+    # Remove tables (simple approach - remove | characters)
+    text = text.replace('|', '')
 
-    # Remove horizontal rules (---, ***, ___)
-    text = re.sub(r'^[\-\*_]{3,}$', '', text, flags=re.MULTILINE)
+    text = _INLINE_MARKDOWN_RE.sub(_strip_inline_markdown, text)
 
-    # Remove inline code (`code` -> code)
-    text = re.sub(r'`([^`]+)`', r'\1', text)
+    return text.strip()
 
-    # Remove links ([text](url) -> text)
-    text = re.sub(r'\[([^\]]+)\]\([^\)]+\)', r'\1', text)
 
-    # Convert bullet points (- item or * item -> item)
-    text = re.sub(r'^\s*[\-\*]\s+', '', text, flags=re.MULTILINE)
+def _get_model_dtype():
+    """Use bfloat16 on CPUs with native bf16 support, the default float32 otherwise"""
+    try:
+        import torch
+    except ImportError:
+        return None
 
-    # Convert numbered lists (1. item -> item)
-    text = re.sub(r'^\s*\d+\.\s+', '', text, flags=re.MULTILINE)
+    bf16_supported = getattr(torch.cpu, "_is_avx512_bf16_supported", None)
+    if bf16_supported and bf16_supported():
+        return torch.bfloat16
 
-    # Remove tables (simple approach - remove | characters)
-    text = re.sub(r'\|', '', text)
+    return None
 
-    # Clean up extra blank lines
-    text = re.sub(r'\n{3,}', '\n\n', text)
 
-    return text.strip()
+def _compile_model(generator):
+    """
+    Compile the model forward pass with torch.compile and warm it up
+    Falls back to eager mode if compilation is unavailable or fails
+    """
+    try:
+        import torch
+    except ImportError:
+        return
+
+    if not hasattr(torch, "compile"):
+        return
+
+    eager_forward = generator.model.forward
+    try:
+        generator.model.forward = torch.compile(eager_forward, dynamic=True)
+
+        # Pay the compilation cost at load time instead of on the first question
+        generator("Hello", max_new_tokens=4, pad_token_id=generator.tokenizer.eos_token_id)
+    except Exception as e:
+        generator.model.forward = eager_forward
+        frappe.logger().info(f"torch.compile unavailable for Chatnext model, using eager mode: {str(e)}")
+
+
+def _get_quantization_config():
+    """Dynamic INT8 quantization config matching the CPU (VNNI int8 dot products when available)"""
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+    try:
+        with open("/proc/cpuinfo") as f:
+            has_vnni = "avx512_vnni" in f.read()
+    except OSError:
+        has_vnni = False
+
+    if has_vnni:
+        return AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+    return AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+
+
+def _load_onnx_pipeline(cache_dir):
+    """
+    Load the model as an INT8-quantized ONNX Runtime graph
+    The export and quantization run once; the result is kept in cache_dir
+    """
+    import onnxruntime
+    from optimum.onnxruntime import ORTQuantizer
+    from transformers import AutoTokenizer
+
+    onnx_dir = os.path.join(cache_dir, "opt-125m-int8-onnx")
+    onnx_file = "model_quantized.onnx"
+
+    if not os.path.exists(os.path.join(onnx_dir, onnx_file)):
+        frappe.logger().info("Exporting Chatnext AI model to ONNX...")
+
+        # Every worker may export at once: each writes to its own directory and the
+        # first complete one is renamed into place, so nobody loads a half-written model
+        export_dir = tempfile.mkdtemp(prefix="opt-125m-int8-onnx-", dir=cache_dir)
+        try:
+            exported = ORTModelForCausalLM.from_pretrained(_model_name, export=True, cache_dir=cache_dir)
+            ORTQuantizer.from_pretrained(exported).quantize(
+                save_dir=export_dir,
+                quantization_config=_get_quantization_config()
+            )
+            exported.config.save_pretrained(export_dir)
+            AutoTokenizer.from_pretrained(_model_name, cache_dir=cache_dir).save_pretrained(export_dir)
+
+            try:
+                os.replace(export_dir, onnx_dir)
+            except OSError:
+                # Another worker's export got there first - use that one
+                if not os.path.exists(os.path.join(onnx_dir, onnx_file)):
+                    raise
+        finally:
+            shutil.rmtree(export_dir, ignore_errors=True)
+
+    session_options = onnxruntime.SessionOptions()
+    session_options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    session_options.intra_op_num_threads = max(1, (os.cpu_count() or 2) // 2)
+
+    model = ORTModelForCausalLM.from_pretrained(
+        onnx_dir,
+        file_name=onnx_file,
+        provider="CPUExecutionProvider",
+        session_options=session_options
+    )
+    tokenizer = AutoTokenizer.from_pretrained(onnx_dir)
+
+    return pipeline("text-generation", model=model, tokenizer=tokenizer)
 
 
 def get_ai_model():
@@ -74,35 +267,129 @@ def get_ai_model():
     Get or initialize the AI model
     Uses a lightweight model that auto-downloads on first use
     """
-    global _model_cache
+    global _model_cache, _generation_kwargs
 
     # Return None if transformers is not available
     if not TRANSFORMERS_AVAILABLE:
         return None
 
     if _model_cache is None:
-        try:
-            frappe.logger().info("Loading AI model for Chatnext...")
-
-            # Create cache directory
-            cache_dir = os.path.join(frappe.get_site_path(), "private", "chatnext_models")
-            os.makedirs(cache_dir, exist_ok=True)
-
-            # Initialize text generation pipeline with small model
-            _model_cache = pipeline(
-                "text-generation",
-                model=_model_name,
-                cache_dir=cache_dir,
-                device=-1  # Use CPU
+        with _model_load_lock:
+            if _model_cache is None:
+                try:
+                    frappe.logger().info("Loading AI model for Chatnext...")
+
+                    # Create cache directory
+                    cache_dir = os.path.join(frappe.get_site_path(), "private", "chatnext_models")
+                    os.makedirs(cache_dir, exist_ok=True)
+
+                    # Prefer the quantized ONNX Runtime model, fall back to plain PyTorch
+                    if OPTIMUM_AVAILABLE:
+                        try:
+                            _model_cache = _load_onnx_pipeline(cache_dir)
+                        except Exception as e:
+                            frappe.log_error(f"AI Model ONNX Load Error: {str(e)}")
+
+                    if _model_cache is None:
+                        # Initialize text generation pipeline with small model
+                        _model_cache = pipeline(
+                            "text-generation",
+                            model=_model_name,
+                            cache_dir=cache_dir,
+                            device=-1,  # Use CPU
+                            torch_dtype=_get_model_dtype()
+                        )
+                        _compile_model(_model_cache)
+
+                    # Batched prompts of different lengths are padded on the left for causal generation
+                    _model_cache.tokenizer.padding_side = "left"
+
+                    _generation_kwargs = {
+                        "num_return_sequences": 1,
+                        "temperature": 0.7,
+                        "do_sample": True,
+                        "top_p": 0.9,
+                        "pad_token_id": _model_cache.tokenizer.eos_token_id
+                    }
+
+                    frappe.logger().info("AI model loaded successfully!")
+
+                except Exception as e:
+                    frappe.log_error(f"AI Model Load Error: {str(e)}")
+                    _model_cache = None
+
+    return _model_cache
+
+
+def _generation_worker():
+    """
+    Run queued local generations in batches
+    Prompts that arrive while a batch is generating are picked up together by the next one
+    """
+    while True:
+        batch = [_generation_queue.get()]
+        while len(batch) < GENERATION_MAX_BATCH:
+            try:
+                batch.append(_generation_queue.get_nowait())
+            except queue.Empty:
+                break
+
+        # Prompts are only batched with others sharing the same model and max_length.
+        # Requests whose caller already timed out are dropped without generating
+        groups = {}
+        for request in batch:
+            if request["abandoned"]:
+                continue
+            groups.setdefault((id(request["model"]), request["max_length"]), []).append(request)
+
+        for group in groups.values():
+            model = group[0]["model"]
+            try:
+                outputs = model(
+                    [request["prompt"] for request in group],
+                    max_length=group[0]["max_length"],
+                    batch_size=len(group),
+                    **_generation_kwargs
+                )
+                for request, output in zip(group, outputs, strict=True):
+                    request["result"] = output[0]['generated_text']
+            except Exception as e:
+                for request in group:
+                    request["error"] = e
+            finally:
+                for request in group:
+                    request["done"].set()
+
+
+def _generate_batched(model, prompt, max_length):
+    """Queue a prompt for the generation thread and wait for its generated text"""
+    global _generation_thread
+
+    with _generation_thread_lock:
+        if _generation_thread is None or not _generation_thread.is_alive():
+            _generation_thread = threading.Thread(
+                target=_generation_worker, name="chatnext-generation", daemon=True
             )
+            _generation_thread.start()
 
-            frappe.logger().info("AI model loaded successfully!")
+    request = {
+        "model": model,
+        "prompt": prompt,
+        "max_length": max_length,
+        "done": threading.Event(),
+        "result": None,
+        "error": None,
+        "abandoned": False
+    }
+    _generation_queue.put(request)
 
-        except Exception as e:
-            frappe.log_error(f"AI Model Load Error: {str(e)}")
-            _model_cache = None
+    if not request["done"].wait(GENERATION_TIMEOUT):
+        request["abandoned"] = True
+        raise TimeoutError("Local AI generation timed out")
+    if request["error"]:
+        raise request["error"]
 
-    return _model_cache
+    return request["result"]
 
 
 def generate_ai_response(question, context=None, max_length=200):
@@ -137,27 +424,19 @@ Question: {question}
 
 Answer:"""
 
-        # Generate response
-        response = model(
-            prompt,
-            max_length=max_length,
-            num_return_sequences=1,
-            temperature=0.7,
-            do_sample=True,
-            top_p=0.9,
-            pad_token_id=model.tokenizer.eos_token_id
-        )
-
-        # Extract generated text
-        generated_text = response[0]['generated_text']
+        # Generate response (batched with any other prompts waiting for the model)
+        generated_text = _generate_batched(model, prompt, max_length)
 
-        # Remove the prompt from response
-        answer = generated_text.replace(prompt, "").strip()
+        # Remove the prompt from response (the pipeline echoes it verbatim at the start)
+        if generated_text.startswith(prompt):
+            answer = generated_text[len(prompt):].strip()
+        else:
+            answer = generated_text.replace(prompt, "", 1).strip()
 
         # Clean up response
         if answer:
             # Take only the first paragraph
-            answer = answer.split('\n\n')[0].strip()
+            answer = answer.split('\n\n', 1)[0].strip()
             return answer
 
         return None
@@ -168,43 +447,89 @@ Answer:"""
 
 
 def get_ai_settings():
-    """Get AI settings from Chatnext Settings"""
+    """
+    Get AI settings from Chatnext Settings
+    Cached per site for SETTINGS_CACHE_TTL seconds, cleared when the settings are saved
+    """
+    entry = _settings_cache.get(frappe.local.site)
+    if entry and time.monotonic() - entry["loaded_at"] < SETTINGS_CACHE_TTL:
+        return entry["settings"]
+
     try:
+        settings = None
         if frappe.db.exists("Chatnext Settings", "Chatnext Settings"):
             settings = frappe.get_doc("Chatnext Settings", "Chatnext Settings")
-            return settings
-        return None
+
+        _settings_cache[frappe.local.site] = {
+            "settings": settings,
+            "api_keys": {},
+            "loaded_at": time.monotonic()
+        }
+        return settings
     except Exception as e:
         frappe.log_error(f"Error fetching AI settings: {str(e)}")
         return None
 
 
-def call_openrouter_api(prompt, context=None, max_tokens=500):
+def get_ai_api_key(fieldname):
+    """Get a decrypted API key from Chatnext Settings, cached alongside the settings"""
+    settings = get_ai_settings()
+    if not settings or not settings.get(fieldname):
+        return None
+
+    api_keys = _settings_cache.get(frappe.local.site, {}).get("api_keys", {})
+    if fieldname not in api_keys:
+        api_keys[fieldname] = settings.get_password(fieldname)
+
+    return api_keys[fieldname]
+
+
+def clear_settings_cache():
+    """Drop the cached Chatnext Settings for the current site"""
+    _settings_cache.pop(frappe.local.site, None)
+
+
+def _post_json(url, data, headers=None, timeout=30):
+    """
+    POST a JSON payload to an AI provider and return the parsed JSON response
+    The body is read as raw bytes and parsed by orjson without decoding it to str first
+    """
+    response = _http_session.post(
+        url, headers=headers, data=orjson.dumps(data), timeout=timeout, stream=True
+    )
+    with response:
+        response.raise_for_status()
+
+        body = bytearray()
+        for chunk in response.iter_content(chunk_size=65536):
+            body += chunk
+
+    return orjson.loads(body)
+
+
+def call_openrouter_api(prompt, context=None, max_tokens=500, settings=None):
     """Call OpenRouter API for AI response"""
     try:
-        settings = get_ai_settings()
-        if not settings or not settings.openrouter_api_key:
+        settings = settings or get_ai_settings()
+        api_key = get_ai_api_key("openrouter_api_key")
+        if not api_key:
             return None
 
-        messages = []
         if context:
-            messages.append({
+            system_message = {
                 "role": "system",
-                "content": f"You are a helpful ERPNext assistant. Use this context to answer: {context}. Always respond in plain text without markdown formatting (no **, ###, ---, or bullet points)."
-            })
+                "content": f"You are a helpful ERPNext assistant. Use this context to answer: {context}. {PLAIN_TEXT_INSTRUCTION}"
+            }
         else:
-            messages.append({
-                "role": "system",
-                "content": "You are a helpful ERPNext assistant. Always respond in plain text without markdown formatting (no **, ###, ---, or bullet points)."
-            })
-        messages.append({
-            "role": "user",
-            "content": prompt
-        })
+            system_message = SYSTEM_MESSAGE
+
+        messages = [
+            system_message,
+            {"role": "user", "content": prompt}
+        ]
 
         headers = {
-            "Authorization": f"Bearer {settings.get_password('openrouter_api_key')}",
-            "Content-Type": "application/json",
+            "Authorization": f"Bearer {api_key}",
             "HTTP-Referer": "https://github.com/your-repo/chatnext",
         }
 
@@ -215,10 +540,7 @@ def call_openrouter_api(prompt, context=None, max_tokens=500):
             "temperature": settings.ai_temperature or 0.7
         }
 
-        response = requests.post(OPENROUTER_API_URL, headers=headers, json=data, timeout=30)
-        response.raise_for_status()
-
-        result = response.json()
+        result = _post_json(OPENROUTER_API_URL, data, headers=headers)
         return remove_markdown_formatting(result['choices'][0]['message']['content'])
 
     except Exception as e:
@@ -226,19 +548,19 @@ def call_openrouter_api(prompt, context=None, max_tokens=500):
         return None
 
 
-def call_gemini_api(prompt, context=None, max_tokens=500):
+def call_gemini_api(prompt, context=None, max_tokens=500, settings=None):
     """Call Google Gemini API for AI response"""
     try:
-        settings = get_ai_settings()
-        if not settings or not settings.gemini_api_key:
+        settings = settings or get_ai_settings()
+        api_key = get_ai_api_key("gemini_api_key")
+        if not api_key:
             return None
 
-        api_key = settings.get_password('gemini_api_key')
         url = f"{GEMINI_API_URL}?key={api_key}"
 
         full_prompt = prompt
         if context:
-            full_prompt = f"Context: {context}\n\nQuestion: {prompt}\n\nProvide a helpful answer for ERPNext users in plain text without any markdown formatting (no **, ###, ---, or bullet points). Use simple paragraphs only."
+            full_prompt = GEMINI_PROMPT_TEMPLATE.format_map({"context": context, "question": prompt})
 
         data = {
             "contents": [{
@@ -250,10 +572,7 @@ def call_gemini_api(prompt, context=None, max_tokens=500):
             }
         }
 
-        response = requests.post(url, json=data, timeout=30)
-        response.raise_for_status()
-
-        result = response.json()
+        result = _post_json(url, data)
         # Handle response structure - Gemini 2.5 may have thinking tokens
         candidate = result['candidates'][0]
         content = candidate.get('content', {})
@@ -270,32 +589,29 @@ def call_gemini_api(prompt, context=None, max_tokens=500):
         return None
 
 
-def call_deepseek_api(prompt, context=None, max_tokens=500):
+def call_deepseek_api(prompt, context=None, max_tokens=500, settings=None):
     """Call DeepSeek API for AI response"""
     try:
-        settings = get_ai_settings()
-        if not settings or not settings.deepseek_api_key:
+        settings = settings or get_ai_settings()
+        api_key = get_ai_api_key("deepseek_api_key")
+        if not api_key:
             return None
 
-        messages = []
         if context:
-            messages.append({
+            system_message = {
                 "role": "system",
-                "content": f"You are a helpful ERPNext assistant. Use this context: {context}. Always respond in plain text without markdown formatting (no **, ###, ---, or bullet points)."
-            })
+                "content": f"You are a helpful ERPNext assistant. Use this context: {context}. {PLAIN_TEXT_INSTRUCTION}"
+            }
         else:
-            messages.append({
-                "role": "system",
-                "content": "You are a helpful ERPNext assistant. Always respond in plain text without markdown formatting (no **, ###, ---, or bullet points)."
-            })
-        messages.append({
-            "role": "user",
-            "content": prompt
-        })
+            system_message = SYSTEM_MESSAGE
+
+        messages = [
+            system_message,
+            {"role": "user", "content": prompt}
+        ]
 
         headers = {
-            "Authorization": f"Bearer {settings.get_password('deepseek_api_key')}",
-            "Content-Type": "application/json"
+            "Authorization": f"Bearer {api_key}"
         }
 
         data = {
@@ -305,10 +621,7 @@ def call_deepseek_api(prompt, context=None, max_tokens=500):
             "temperature": settings.ai_temperature or 0.7
         }
 
-        response = requests.post(DEEPSEEK_API_URL, headers=headers, json=data, timeout=30)
-        response.raise_for_status()
-
-        result = response.json()
+        result = _post_json(DEEPSEEK_API_URL, data, headers=headers)
         return remove_markdown_formatting(result['choices'][0]['message']['content'])
 
     except Exception as e:
@@ -316,39 +629,87 @@ def call_deepseek_api(prompt, context=None, max_tokens=500):
         return None
 
 
-def call_ollama_api(prompt, context=None, max_tokens=500):
+def call_ollama_api(prompt, context=None, max_tokens=500, settings=None):
     """Call Ollama local API for AI response"""
     try:
-        settings = get_ai_settings()
+        settings = settings or get_ai_settings()
 
         # Build full prompt with context
-        full_prompt = "You are a helpful ERPNext assistant. Always respond in plain text without markdown formatting (no **, ###, ---, or bullet points).\n\n"
+        prompt_parts = [OLLAMA_PROMPT_HEAD]
         if context:
-            full_prompt += f"Context: {context}\n\n"
-        full_prompt += f"Question: {prompt}\n\nAnswer:"
+            prompt_parts += ["Context: ", context, "\n\n"]
+        prompt_parts += ["Question: ", prompt, "\n\nAnswer:"]
+        full_prompt = "".join(prompt_parts)
 
         # Ollama API format
         data = {
             "model": "llama3.2:3b",  # Fast 3B model, can be changed in settings
             "prompt": full_prompt,
-            "stream": False,
+            "stream": True,
             "options": {
                 "temperature": settings.ai_temperature if settings else 0.7,
                 "num_predict": max_tokens
             }
         }
 
-        response = requests.post(OLLAMA_API_URL, json=data, timeout=180)  # 3 minutes for CPU mode
-        response.raise_for_status()
+        # Stream the generation as NDJSON chunks. OLLAMA_GENERATION_TIMEOUT bounds the whole call:
+        # the read timeout starts at the full budget and is cut to what is left after every chunk
+        deadline = time.monotonic() + OLLAMA_GENERATION_TIMEOUT
+        response = _http_session.post(
+            OLLAMA_API_URL,
+            data=orjson.dumps(data),
+            timeout=(5, OLLAMA_GENERATION_TIMEOUT),
+            stream=True
+        )
+        with response:
+            response.raise_for_status()
+            sock = getattr(response.raw.connection, "sock", None)
+
+            pieces = []
+            done = False
+            try:
+                for line in response.iter_lines(chunk_size=4096):
+                    if line:
+                        chunk = orjson.loads(line)
+                        pieces.append(chunk.get('response', ''))
+                        if chunk.get('done'):
+                            done = True
+                            break
+
+                    # Closing the stream makes Ollama stop generating and frees the worker
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    if sock:
+                        sock.settimeout(remaining)
+            except requests.exceptions.RequestException:
+                # Read timed out at the deadline, or the stream broke off
+                pass
+
+        # A cut-off answer must not be shown as complete (or cached as the answer)
+        if not done:
+            frappe.logger().info("Chatnext: Ollama answer incomplete after OLLAMA_GENERATION_TIMEOUT, discarded")
+            return None
 
-        result = response.json()
-        return remove_markdown_formatting(result.get('response', '').strip())
+        return remove_markdown_formatting("".join(pieces).strip())
 
     except Exception as e:
         frappe.log_error(f"Ollama API Error: {str(e)}")
         return None
 
 
+def get_ai_response_cache_key(question, kb_articles, language, provider):
+    """Build the cache key for an AI answer from everything that shapes the prompt"""
+    key_source = "|".join([
+        provider,
+        language or "",
+        question.strip().lower(),
+        *(a.get('title') or "" for a in kb_articles)
+    ])
+    digest = hashlib.blake2b(key_source.encode(), digest_size=16).hexdigest()
+    return f"chatnext:ai_response:{digest}"
+
+
 def get_ai_enhanced_response(question, kb_articles, language="English"):
     """
     Get AI-enhanced response using knowledge base context
@@ -363,16 +724,25 @@ def get_ai_enhanced_response(question, kb_articles, language="English"):
         dict: Response with answer, source, confidence
     """
     try:
+        # Callers gate on is_ai_enabled() (shared Redis flag); the per-worker settings
+        # are only read for the provider options, so a stale copy can't re-enable AI
         settings = get_ai_settings()
-        if not settings or not settings.enable_ai_responses:
+        if not settings:
             return None
 
-        # Build context from top KB articles
-        context_parts = []
-        for article in kb_articles[:3]:  # Use top 3 articles
-            context_parts.append(f"- {article.get('title')}: {article.get('answer', '')[:300]}")
+        provider = settings.ai_provider or "Local (Transformers)"
+        top_articles = kb_articles[:3]  # Use top 3 articles
+
+        # Identical questions over the same KB articles get the cached answer
+        cache_key = get_ai_response_cache_key(question, top_articles, language, provider)
+        cached_response = frappe.cache().get_value(cache_key)
+        if cached_response:
+            return cached_response
 
-        context = "\n".join(context_parts) if context_parts else "No specific knowledge base articles found."
+        # Build context from top KB articles (None lets callers use their shorter no-context prompt)
+        context = "\n".join([
+            f"- {a.get('title')}: {(a.get('answer') or '')[:300]}" for a in top_articles
+        ])[:MAX_CONTEXT_LENGTH] or None
 
         # Add language instruction
         prompt = question
@@ -381,26 +751,27 @@ def get_ai_enhanced_response(question, kb_articles, language="English"):
 
         # Route to appropriate AI provider
         ai_answer = None
-        provider = settings.ai_provider or "Local (Transformers)"
 
         if provider == "OpenRouter":
-            ai_answer = call_openrouter_api(prompt, context, settings.ai_max_tokens or 500)
+            ai_answer = call_openrouter_api(prompt, context, settings.ai_max_tokens or 500, settings)
         elif provider == "Google Gemini":
-            ai_answer = call_gemini_api(prompt, context, settings.ai_max_tokens or 500)
+            ai_answer = call_gemini_api(prompt, context, settings.ai_max_tokens or 500, settings)
         elif provider == "DeepSeek":
-            ai_answer = call_deepseek_api(prompt, context, settings.ai_max_tokens or 500)
+            ai_answer = call_deepseek_api(prompt, context, settings.ai_max_tokens or 500, settings)
         elif provider == "Ollama (Local)":
-            ai_answer = call_ollama_api(prompt, context, settings.ai_max_tokens or 500)
+            ai_answer = call_ollama_api(prompt, context, settings.ai_max_tokens or 500, settings)
         else:  # Local (Transformers)
             ai_answer = generate_ai_response(prompt, context, max_length=settings.ai_max_tokens or 150)
 
         if ai_answer and len(ai_answer) > 20:  # Ensure meaningful response
-            return {
+            response = {
                 "answer": ai_answer,
                 "source": "LLM",  # Must match Chat Message source options
                 "confidence": 85 if provider != "Local (Transformers)" else 75,
-                "suggestions": [a.get('title') for a in kb_articles[:3]]
+                "suggestions": [a.get('title') for a in top_articles]
             }
+            frappe.cache().set_value(cache_key, response, expires_in_sec=AI_RESPONSE_CACHE_TTL)
+            return response
 
         return None
 
@@ -417,13 +788,14 @@ def is_ai_enabled():
         bool: True if AI is enabled
     """
     try:
-        # Check if Chatnext Settings exists and AI is enabled
-        if frappe.db.exists("Chatnext Settings", "Chatnext Settings"):
-            settings = frappe.get_doc("Chatnext Settings", "Chatnext Settings")
-            return getattr(settings, 'enable_ai_responses', False)
-
-        # Default: AI disabled (only use KB)
-        return False
+        # A single flag read on every query - cached in Redis rather than loading the settings doc.
+        # A missing Settings record reads as 0: AI disabled (only use KB)
+        return bool(frappe.cache().get_value(
+            AI_ENABLED_CACHE_KEY,
+            generator=lambda: frappe.utils.cint(
+                frappe.db.get_single_value("Chatnext Settings", "enable_ai_responses")
+            )
+        ))
 
     except Exception:
         return False
@@ -431,10 +803,46 @@ def is_ai_enabled():
 
 def preload_model():
     """
-    Preload AI model in background (call during server start)
+    Preload AI model (run in the background by preload_model_in_background)
     """
     try:
         get_ai_model()
         frappe.logger().info("Chatnext AI model preloaded")
     except Exception as e:
         frappe.log_error(f"AI Model Preload Error: {str(e)}")
+
+
+def preload_model_in_background():
+    """
+    Start loading the local model on a worker's first request (before_request hook)
+    Only when AI is enabled with the local provider; checked once per worker process
+    """
+    global _preload_started
+
+    if _preload_started:
+        return
+    _preload_started = True
+
+    if not TRANSFORMERS_AVAILABLE or _model_cache is not None or not is_ai_enabled():
+        return
+
+    settings = get_ai_settings()
+    if not settings or (settings.ai_provider or "Local (Transformers)") != "Local (Transformers)":
+        return
+
+    threading.Thread(
+        target=_preload_model_for_site,
+        args=(frappe.local.site, frappe.local.sites_path),
+        name="chatnext-preload",
+        daemon=True
+    ).start()
+
+
+def _preload_model_for_site(site, sites_path):
+    """Thread target: preload_model needs its own site context and DB connection"""
+    frappe.init(site=site, sites_path=sites_path)
+    try:
+        frappe.connect()
+        preload_model()
+    finally:
+        frappe.destroy()
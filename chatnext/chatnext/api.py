@@ -5,10 +5,137 @@ Backend APIs for query handling, knowledge base search, and chat functionality
 
 import frappe
 from frappe import _
+from frappe.utils import cint, now_datetime
+import hashlib
 import re
 import json
-from datetime import datetime
+from functools import lru_cache
+from types import MappingProxyType
 from chatnext.chatnext.ai_engine import get_ai_enhanced_response, is_ai_enabled
+from chatnext.chatnext.doctype.proactive_rule.proactive_rule import PROACTIVE_RULES_CACHE_KEY
+
+RULE_CONDITION_CACHE_TTL = 60  # seconds
+
+# Identical messages re-sent to the same session within this window get the previous answer
+QUERY_DEDUP_TTL = 5  # seconds
+
+# Keywords of a search query that are scored (the rest of a long query is ignored)
+KB_SEARCH_MAX_KEYWORDS = 16
+
+# Columns returned for each knowledge base search hit
+KB_ARTICLE_FIELDS = (
+    "name, title, question, answer, answer_urdu, category, language, "
+    "usage_count, helpful_count, related_doctype, keywords"
+)
+
+# Server Scripts, Notifications and Webhooks on Chat Message force the regular insert
+CHAT_MESSAGE_LISTENERS_CACHE_KEY = "chatnext:chat_message_listeners"
+CHAT_MESSAGE_LISTENERS_CACHE_TTL = 60  # seconds
+
+# Columns written by save_messages
+CHAT_MESSAGE_FIELDS = (
+    "session", "message_type", "message", "timestamp", "language",
+    "query_intent", "source", "source_reference", "confidence_score"
+)
+
+# Intent patterns, in priority order
+INTENT_KEYWORDS = {
+    "how_to": ["how to", "how do i", "how can i", "kaise", "kaisay"],
+    "what_is": ["what is", "what are", "define", "kya hai", "kia hai"],
+    "create": ["create", "new", "add", "banao", "banana"],
+    "error": ["error", "issue", "problem", "not working", "masla", "kharabi"],
+    "find": ["find", "search", "where", "kahan", "dhundo"],
+    "report": ["report", "list", "show me", "dikhao", "report"],
+    "setup": ["setup", "configure", "settings", "setting", "configuration"]
+}
+INTENT_NAMES = tuple(INTENT_KEYWORDS)
+_INTENT_RANK = {intent: rank for rank, intent in enumerate(INTENT_NAMES)}
+
+# One alternation over every keyword, one named group per intent. The lookahead
+# makes it report a match at every position, so overlapping keywords
+# ("define" / "find") can't hide a higher-priority intent.
+_INTENT_RE = re.compile(
+    "(?=" + "|".join(
+        f"(?P<{intent}>{'|'.join(re.escape(k) for k in keywords)})"
+        for intent, keywords in INTENT_KEYWORDS.items()
+    ) + ")",
+    re.IGNORECASE
+)
+
+# Urdu letters land in group 1, English letters match without a group
+_LANGUAGE_CHAR_RE = re.compile(r'([\u0600-\u06FF])|[a-zA-Z]')
+
+# Small talk that never matches a KB article or needs the AI provider
+GREETINGS = frozenset({
+    "hi", "hello", "hey", "hii", "helo", "salam", "salaam", "aoa", "assalam o alaikum",
+    "assalamualaikum", "assalam-o-alaikum", "good morning", "good afternoon", "good evening",
+    "thanks", "thank you", "thankyou", "shukriya", "ok", "okay", "bye", "khuda hafiz",
+    "السلام علیکم", "سلام", "شکریہ", "ہیلو"
+})
+
+# Intent-based responses
+INTENT_RESPONSES_EN = {
+    "how_to": "To help you better, could you please specify which module or feature you need help with? For example: Sales, Purchase, HR, Inventory, etc.",
+    "what_is": "I can explain ERPNext concepts. Please specify what you'd like to know about.",
+    "create": "I can guide you on creating documents in ERPNext. Which document type would you like to create?",
+    "error": "I'd be happy to help troubleshoot. Could you please describe the error or issue in more detail?",
+    "find": "You can use the Awesome Bar (Ctrl+K) to search globally. What specifically are you looking for?",
+    "report": "ERPNext has many built-in reports. Which module's reports are you interested in?",
+    "setup": "I can help with ERPNext setup. Which area would you like to configure?"
+}
+
+INTENT_RESPONSES_UR = {
+    "how_to": "آپ کی مدد کرنے کے لیے، براہ کرم بتائیں کہ آپ کو کس ماڈیول یا فیچر میں مدد چاہیے؟ مثال: Sales, Purchase, HR, Inventory",
+    "what_is": "میں ERPNext کے تصورات سمجھا سکتا ہوں۔ براہ کرم بتائیں آپ کیا جاننا چاہتے ہیں۔",
+    "create": "میں آپ کو ERPNext میں documents بنانے میں مدد کر سکتا ہوں۔ آپ کون سا document بنانا چاہتے ہیں؟",
+    "error": "میں مسئلہ حل کرنے میں مدد کروں گا۔ براہ کرم error یا issue کی تفصیل بتائیں۔",
+    "find": "آپ Awesome Bar (Ctrl+K) استعمال کر کے تلاش کر سکتے ہیں۔ آپ کیا ڈھونڈ رہے ہیں؟",
+    "report": "ERPNext میں بہت سی رپورٹس ہیں۔ آپ کو کس ماڈیول کی رپورٹس چاہیے؟",
+    "setup": "میں ERPNext setup میں مدد کر سکتا ہوں۔ آپ کیا configure کرنا چاہتے ہیں؟"
+}
+
+# Context-aware responses, keyed by the DocType the chat was opened from
+CONTEXT_RESPONSES_EN = {
+    "Sales Invoice": "I can help you with Sales Invoices. Common actions: Create new invoice, Check payment status, Print invoice, Submit invoice. What would you like to do?",
+    "Purchase Order": "I can help with Purchase Orders. You can: Create PO, Receive items, Check status, or Amend PO. What do you need?",
+    "Employee": "I can help with Employee records. You can: View attendance, Check leave balance, Update details, or Create salary slip. What would you like to know?",
+    "Stock Entry": "I can help with Stock Entries. Common operations: Material Transfer, Receipt, Issue, Manufacture. What do you need help with?",
+    "Customer": "I can help manage Customer records. You can: View history, Check outstanding, Create quotation, or Update details. What would you like to do?"
+}
+
+CONTEXT_RESPONSES_UR = {
+    "Sales Invoice": "میں Sales Invoices میں مدد کر سکتا ہوں۔ عام کام: نیا invoice بنانا، payment status چیک کرنا، invoice print کرنا۔ آپ کیا کرنا چاہتے ہیں؟",
+    "Purchase Order": "میں Purchase Orders میں مدد کر سکتا ہوں۔ آپ کر سکتے ہیں: PO بنانا، items receive کرنا، status چیک کرنا۔ کیا چاہیے؟",
+    "Employee": "میں Employee records میں مدد کر سکتا ہوں۔ آپ دیکھ سکتے ہیں: Attendance، Leave balance، Details update کرنا۔ کیا جاننا چاہتے ہیں؟",
+    "Stock Entry": "میں Stock Entries میں مدد کر سکتا ہوں۔ عام operations: Material Transfer، Receipt، Issue، Manufacture۔ کیا مدد چاہیے؟",
+    "Customer": "میں Customer records manage کرنے میں مدد کروں گا۔ آپ کر سکتے ہیں: History دیکھنا، Outstanding چیک کرنا، Quotation بنانا۔"
+}
+
+
+def _freeze_reply(answer, source, confidence):
+    """Build a read-only response mapping for a canned answer"""
+    return MappingProxyType({
+        "answer": answer,
+        "source": source,
+        "confidence": confidence,
+        "suggestions": ()
+    })
+
+
+# Complete canned responses, built once and shared by every request
+INTENT_REPLIES_EN = {k: _freeze_reply(v, "Rule-Based", 70) for k, v in INTENT_RESPONSES_EN.items()}
+INTENT_REPLIES_UR = {k: _freeze_reply(v, "Rule-Based", 70) for k, v in INTENT_RESPONSES_UR.items()}
+CONTEXT_REPLIES_EN = {k: _freeze_reply(v, "Context-Aware", 85) for k, v in CONTEXT_RESPONSES_EN.items()}
+CONTEXT_REPLIES_UR = {k: _freeze_reply(v, "Context-Aware", 85) for k, v in CONTEXT_RESPONSES_UR.items()}
+
+DEFAULT_REPLY_EN = _freeze_reply(
+    "I'm here to help! Please ask your question in detail. You can ask me about any ERPNext module: Sales, Purchase, Inventory, HR, Accounting, Manufacturing, etc. How can I assist you today?",
+    "Rule-Based", 50
+)
+DEFAULT_REPLY_UR = _freeze_reply(
+    "میں آپ کی مدد کے لیے حاضر ہوں! براہ کرم اپنا سوال تفصیل سے پوچھیں۔ آپ مجھ سے ERPNext کے کسی بھی module کے بارے میں پوچھ سکتے ہیں: Sales, Purchase, Inventory, HR, Accounting, Manufacturing, وغیرہ۔",
+    "Rule-Based", 50
+)
 
 
 @frappe.whitelist()
@@ -27,33 +154,60 @@ def query(message, session_id=None, context_doctype=None, context_docname=None,
         dict: Response with answer, session_id, and metadata
     """
     try:
+        # Retries and double-sends of the same message reuse the answer just given.
+        # New sessions are never deduplicated - each call must create its own session
+        dedup_key = None
+        if session_id:
+            message_hash = hashlib.md5(message.encode()).hexdigest()
+            dedup_key = (
+                f"chatnext:query:{frappe.session.user}:{session_id}:{message_hash}:{context_doctype}:{language}"
+            )
+            cached = frappe.cache().get_value(dedup_key)
+            if cached:
+                return cached
+
+        # One clock read for everything stamped when the message arrives
+        received_at = now_datetime()
+
         # Create or get session
         if not session_id:
             session = create_session(
                 user=frappe.session.user,
                 context_doctype=context_doctype,
                 context_docname=context_docname,
-                language=language
+                language=language,
+                timestamp=received_at
             )
             session_id = session.name
         else:
-            session = frappe.get_doc("Chat Session", session_id)
+            # Only a few scalars are needed - skip building the full Document
+            session = frappe.db.get_value(
+                "Chat Session", session_id,
+                ["name", "context_doctype", "message_count"],
+                as_dict=True
+            )
+            if not session:
+                frappe.throw(_("Chat Session {0} not found").format(session_id), frappe.DoesNotExistError)
+
+            # The raw reads and writes below skip permission checks, so enforce them here
+            # (session names are sequential; the All role may only write its own sessions)
+            frappe.has_permission("Chat Session", "write", session_id, throw=True)
 
         # Detect language if auto
         detected_language = detect_language(message) if language == "Auto Detect" else language
 
-        # Save user message
-        user_message = save_message(
-            session_id=session_id,
-            message=message,
-            message_type="User",
-            language=detected_language
-        )
-
         # Detect query intent
         intent = detect_intent(message)
-        user_message.query_intent = intent
-        user_message.save()
+
+        # User message is saved together with the reply below
+        user_message = {
+            "session": session_id,
+            "message_type": "User",
+            "message": message,
+            "timestamp": received_at,
+            "language": detected_language,
+            "query_intent": intent
+        }
 
         # Get response
         response_data = get_response(
@@ -63,33 +217,45 @@ def query(message, session_id=None, context_doctype=None, context_docname=None,
             language=detected_language
         )
 
-        # Save bot response
-        bot_message = save_message(
-            session_id=session_id,
-            message=response_data["answer"],
-            message_type="Bot",
-            language=detected_language,
-            source=response_data.get("source", "Rule-Based"),
-            confidence_score=response_data.get("confidence", 0)
-        )
+        # Save user message and bot response in one round trip
+        bot_message = {
+            "session": session_id,
+            "message_type": "Bot",
+            "message": response_data["answer"],
+            # Stamped when the reply is ready so it sorts after the question
+            "timestamp": now_datetime(),
+            "language": detected_language,
+            "source": response_data.get("source", "Rule-Based"),
+            "confidence_score": response_data.get("confidence", 0),
+            "source_reference": response_data.get("source_reference")
+        }
+        bot_message_id = save_messages([user_message, bot_message])[-1]
 
-        # Update session
-        session.message_count = session.message_count + 2
-        session.last_message = message[:200]
-        session.save()
+        # Update session counters without reloading/validating the whole document
+        frappe.db.set_value("Chat Session", session_id, {
+            "message_count": (session.message_count or 0) + 2,
+            "last_message": message[:200]
+        })
+
+        # Single commit for the session, both messages and the counters
         frappe.db.commit()
 
-        return {
+        result = {
             "success": True,
             "session_id": session_id,
             "answer": response_data["answer"],
             "source": response_data.get("source"),
             "confidence": response_data.get("confidence"),
             "suggestions": response_data.get("suggestions", []),
-            "message_id": bot_message.name
+            "message_id": bot_message_id
         }
+        if dedup_key:
+            frappe.cache().set_value(dedup_key, result, expires_in_sec=QUERY_DEDUP_TTL)
+
+        return result
 
     except Exception as e:
+        frappe.db.rollback()
         frappe.log_error(f"Chatnext Query Error: {str(e)}")
         return {
             "success": False,
@@ -113,46 +279,66 @@ def search_knowledge_base(query, category=None, language=None, limit=10):
         list: Matching knowledge base articles
     """
     try:
-        filters = {"is_active": 1}
+        # Each keyword adds a LIKE term to the SQL, so repeats are dropped and the count is capped
+        query_keywords = list(dict.fromkeys(query.lower().split()))[:KB_SEARCH_MAX_KEYWORDS]
+        if not query_keywords:
+            return []
+
+        conditions = ["is_active = 1"]
+        values = {"limit": cint(limit)}
 
         if category:
-            filters["category"] = category
+            conditions.append("category = %(category)s")
+            values["category"] = category
 
         if language and language != "Auto Detect":
-            filters["language"] = ["in", [language, "Bilingual"]]
-
-        # Search in title, question, keywords
-        articles = frappe.get_all(
-            "Knowledge Base Article",
-            filters=filters,
-            fields=["name", "title", "question", "answer", "answer_urdu", "category",
-                    "language", "usage_count", "helpful_count", "related_doctype", "keywords"],
-            limit_page_length=limit
-        )
-
-        # Simple keyword matching (can be enhanced with better search)
-        query_lower = query.lower()
-        query_keywords = query_lower.split()
-
-        scored_articles = []
-        for article in articles:
-            score = 0
-            # Include keywords field in search
-            article_text = f"{article.get('title', '')} {article.get('question', '')} {article.get('keywords', '')}".lower()
-
-            # Score based on keyword matches
-            for keyword in query_keywords:
-                if keyword in article_text:
-                    score += 1
-
-            if score > 0:
-                article['relevance_score'] = score
-                scored_articles.append(article)
-
-        # Sort by relevance
-        scored_articles.sort(key=lambda x: x['relevance_score'], reverse=True)
-
-        return scored_articles
+            conditions.append("language IN (%(language)s, 'Bilingual')")
+            values["language"] = language
+
+        # One point per query keyword found in the title, question or keywords
+        score_terms = []
+        for i, keyword in enumerate(query_keywords):
+            values[f"keyword_{i}"] = f"%{escape_like(keyword)}%"
+            score_terms.append(
+                f"CASE WHEN LOWER(CONCAT_WS(' ', title, question, keywords)) LIKE %(keyword_{i})s THEN 1 ELSE 0 END"
+            )
+        relevance_score = " + ".join(score_terms)
+        where = " AND ".join(conditions)
+
+        # Rank in the database and read the top matches in the same query
+        articles = None
+        if frappe.db.db_type == "mariadb":
+            # tf-idf ranking from the FULLTEXT index added in knowledge_base_article.on_doctype_update
+            values["query"] = query
+            try:
+                articles = frappe.db.sql(f"""
+                    SELECT {KB_ARTICLE_FIELDS}, ({relevance_score}) AS relevance_score,
+                        MATCH(title, question, keywords, answer) AGAINST (%(query)s IN NATURAL LANGUAGE MODE) AS fulltext_score
+                    FROM `tabKnowledge Base Article`
+                    WHERE {where}
+                        AND MATCH(title, question, keywords, answer) AGAINST (%(query)s IN NATURAL LANGUAGE MODE)
+                    ORDER BY fulltext_score DESC
+                    LIMIT %(limit)s
+                """, values, as_dict=True)
+            except Exception as e:
+                # e.g. the FULLTEXT index is missing (not migrated yet): keep searching by keyword
+                frappe.logger().warning(f"Chatnext: KB FULLTEXT search failed, using keyword search: {str(e)}")
+
+        # Keyword scan for other databases, for queries made only of stopwords or
+        # words too short for the FULLTEXT index, and when the FULLTEXT query fails
+        if not articles:
+            articles = frappe.db.sql(f"""
+                SELECT {KB_ARTICLE_FIELDS}, relevance_score FROM (
+                    SELECT {KB_ARTICLE_FIELDS}, modified, ({relevance_score}) AS relevance_score
+                    FROM `tabKnowledge Base Article`
+                    WHERE {where}
+                ) scored
+                WHERE relevance_score > 0
+                ORDER BY relevance_score DESC, modified DESC
+                LIMIT %(limit)s
+            """, values, as_dict=True)
+
+        return articles or []
 
     except Exception as e:
         frappe.log_error(f"KB Search Error: {str(e)}")
@@ -174,7 +360,13 @@ def submit_feedback(message_id, rating, feedback_text=None, correction=None):
         dict: Success status
     """
     try:
-        message = frappe.get_doc("Chat Message", message_id)
+        message = frappe.db.get_value(
+            "Chat Message", message_id,
+            ["session", "source", "source_reference"],
+            as_dict=True
+        )
+        if not message:
+            frappe.throw(_("Chat Message {0} not found").format(message_id), frappe.DoesNotExistError)
 
         # Create feedback
         feedback = frappe.get_doc({
@@ -185,17 +377,16 @@ def submit_feedback(message_id, rating, feedback_text=None, correction=None):
             "rating": rating,
             "feedback_text": feedback_text,
             "correction": correction,
-            "timestamp": datetime.now()
+            "timestamp": now_datetime()
         })
         feedback.insert()
 
         # Update message
-        message.helpful = "Yes" if rating == "Helpful" else "No"
-        message.save()
+        frappe.db.set_value("Chat Message", message_id, "helpful", "Yes" if rating == "Helpful" else "No")
 
         # Update KB article if applicable
-        if message.source == "Knowledge Base":
-            update_kb_stats(message.message, rating)
+        if message.source == "Knowledge Base" and message.source_reference:
+            update_kb_stats(message.source_reference, rating)
 
         frappe.db.commit()
 
@@ -248,19 +439,13 @@ def get_proactive_suggestions(doctype=None, docname=None):
     try:
         suggestions = []
 
-        # Get active proactive rules
-        rules = frappe.get_all(
-            "Proactive Rule",
-            filters={"is_active": 1},
-            fields=["name", "rule_name", "rule_type", "target_doctype", "condition",
-                    "suggestion_template", "suggestion_template_urdu", "priority"]
+        # Active rules for this context, highest priority first (cached until a rule is changed)
+        rules = frappe.cache().get_value(
+            f"{PROACTIVE_RULES_CACHE_KEY}:{doctype or ''}",
+            generator=lambda: get_active_rules(doctype)
         )
 
         for rule in rules:
-            # Check if rule applies to current context
-            if doctype and rule.target_doctype and rule.target_doctype != doctype:
-                continue
-
             # Execute rule condition (simplified - can be enhanced)
             if check_rule_condition(rule, doctype, docname):
                 suggestions.append({
@@ -271,10 +456,6 @@ def get_proactive_suggestions(doctype=None, docname=None):
                     "type": rule.rule_type
                 })
 
-        # Sort by priority
-        priority_order = {"Critical": 0, "High": 1, "Medium": 2, "Low": 3}
-        suggestions.sort(key=lambda x: priority_order.get(x["priority"], 4))
-
         return suggestions
 
     except Exception as e:
@@ -284,13 +465,19 @@ def get_proactive_suggestions(doctype=None, docname=None):
 
 # Helper Functions
 
-def create_session(user, context_doctype=None, context_docname=None, language="Auto Detect"):
+def escape_like(text):
+    """Escape LIKE wildcards so user input is matched literally"""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def create_session(user, context_doctype=None, context_docname=None, language="Auto Detect", timestamp=None):
     """Create a new chat session"""
+    timestamp = timestamp or now_datetime()
     session = frappe.get_doc({
         "doctype": "Chat Session",
-        "session_title": f"Chat - {datetime.now().strftime('%Y-%m-%d %H:%M')}",
+        "session_title": f"Chat - {timestamp.strftime('%Y-%m-%d %H:%M')}",
         "user": user,
-        "start_time": datetime.now(),
+        "start_time": timestamp,
         "status": "Active",
         "context_doctype": context_doctype,
         "context_docname": context_docname,
@@ -298,59 +485,108 @@ def create_session(user, context_doctype=None, context_docname=None, language="A
         "message_count": 0
     })
     session.insert()
-    frappe.db.commit()
     return session
 
 
-def save_message(session_id, message, message_type, language, source=None, confidence_score=None):
-    """Save a chat message"""
-    msg = frappe.get_doc({
-        "doctype": "Chat Message",
-        "session": session_id,
-        "message_type": message_type,
-        "message": message,
-        "timestamp": datetime.now(),
-        "language": language,
-        "source": source,
-        "confidence_score": confidence_score
-    })
-    msg.insert()
-    frappe.db.commit()
-    return msg
+def save_messages(messages):
+    """
+    Save chat messages with a single INSERT (committed by the caller)
 
+    The bulk path skips Document.insert(): no validation, and no doc_events.
+    Chat Message has no controller logic of its own; the one insert() step that
+    matters for user input, HTML sanitizing, is run explicitly. Framework-wide "*" handlers (assignment rules,
+    energy points, milestones) are deliberately skipped for these log rows.
+    Regular insert() is still used when anything targets Chat Message
+    specifically - an app's doc_events, or a site's Server Script,
+    Notification or Webhook - see chat_message_has_listeners().
 
+    Args:
+        messages (list): Chat Message field values, one dict per message
+
+    Returns:
+        list: Names of the saved messages, in the same order
+    """
+    docs = []
+    for values in messages:
+        doc = frappe.new_doc("Chat Message")
+        doc.update(values)
+        docs.append(doc)
+
+    # Anything listening to Chat Message events needs the regular insert to fire them
+    if chat_message_has_listeners():
+        for doc in docs:
+            doc.insert()
+        return [doc.name for doc in docs]
+
+    now = frappe.utils.now()
+    for doc in docs:
+        doc.set_new_name()
+        doc.update({
+            "owner": frappe.session.user,
+            "creation": now,
+            "modified": now,
+            "modified_by": frappe.session.user,
+            "docstatus": 0
+        })
+        # The message is user input: strip unsafe HTML as insert() would
+        doc._sanitize_content()
+
+    fields = ["name", "owner", "creation", "modified", "modified_by", "docstatus", *CHAT_MESSAGE_FIELDS]
+    frappe.db.bulk_insert("Chat Message", fields, [tuple(doc.get(f) for f in fields) for doc in docs])
+    return [doc.name for doc in docs]
+
+
+def chat_message_has_listeners():
+    """
+    Check whether an app or site configuration reacts to Chat Message events
+    Site-level consumers are looked up at most once per CHAT_MESSAGE_LISTENERS_CACHE_TTL seconds
+    """
+    if "Chat Message" in frappe.get_hooks("doc_events"):
+        return True
+
+    result = frappe.cache().get_value(CHAT_MESSAGE_LISTENERS_CACHE_KEY)
+    if result is None:
+        result = bool(
+            frappe.get_all("Server Script", filters={
+                "reference_doctype": "Chat Message", "script_type": "DocType Event", "disabled": 0
+            }, limit=1)
+            or frappe.get_all("Notification", filters={"document_type": "Chat Message", "enabled": 1}, limit=1)
+            or frappe.get_all("Webhook", filters={"webhook_doctype": "Chat Message", "enabled": 1}, limit=1)
+        )
+        frappe.cache().set_value(
+            CHAT_MESSAGE_LISTENERS_CACHE_KEY, result, expires_in_sec=CHAT_MESSAGE_LISTENERS_CACHE_TTL
+        )
+
+    return result
+
+
+@lru_cache(maxsize=8192)
 def detect_language(text):
     """Detect language of text (English or Urdu)"""
-    # Simple detection based on character ranges
-    urdu_chars = re.findall(r'[\u0600-\u06FF]', text)
-    english_chars = re.findall(r'[a-zA-Z]', text)
+    # Simple detection based on character ranges, counted in a single scan
+    # without building lists of the matched characters
+    balance = 0
+    for match in _LANGUAGE_CHAR_RE.finditer(text):
+        balance += 1 if match.lastindex else -1
 
-    if len(urdu_chars) > len(english_chars):
+    if balance > 0:
         return "Urdu"
     return "English"
 
 
+@lru_cache(maxsize=8192)
 def detect_intent(message):
     """Detect user query intent"""
-    message_lower = message.lower()
-
-    # Intent patterns
-    intents = {
-        "how_to": ["how to", "how do i", "how can i", "kaise", "kaisay"],
-        "what_is": ["what is", "what are", "define", "kya hai", "kia hai"],
-        "create": ["create", "new", "add", "banao", "banana"],
-        "error": ["error", "issue", "problem", "not working", "masla", "kharabi"],
-        "find": ["find", "search", "where", "kahan", "dhundo"],
-        "report": ["report", "list", "show me", "dikhao", "report"],
-        "setup": ["setup", "configure", "settings", "setting", "configuration"]
-    }
+    # Several intents can match; the one listed first in INTENT_KEYWORDS wins
+    best = None
+    for match in _INTENT_RE.finditer(message):
+        rank = _INTENT_RANK[match.lastgroup]
+        if best is None or rank < best:
+            best = rank
+            if rank == 0:
+                break
 
-    for intent_type, keywords in intents.items():
-        for keyword in keywords:
-            if keyword in message_lower:
-                return intent_type
-
-    return "general"
+    return INTENT_NAMES[best] if best is not None else "general"
 
 
 def get_response(message, intent, session, language):
@@ -358,6 +594,11 @@ def get_response(message, intent, session, language):
     Get response for user query
     Priority: 1. AI-Enhanced (if enabled), 2. Knowledge Base, 3. Rule-based, 4. Default
     """
+    # Greetings and one-word messages can't produce a KB match (that takes 3 keyword hits),
+    # so answer them without the KB search or an AI call
+    if _is_greeting(message) or len(message.split()) < 2:
+        return get_rule_based_response(message, intent, session, language) or get_default_response(language)
+
     # Try knowledge base search
     kb_articles = search_knowledge_base(message, language=language, limit=3)
 
@@ -367,21 +608,27 @@ def get_response(message, intent, session, language):
         if ai_response:
             return ai_response
 
-    # Fall back to perfect KB match if AI failed
-    if kb_articles and kb_articles[0].get('relevance_score', 0) >= 3:
-        article = kb_articles[0]
-
-        # Update usage count
-        frappe.db.set_value("Knowledge Base Article", article['name'],
-                           "usage_count", article.get('usage_count', 0) + 1)
+    # Fall back to perfect KB match if AI failed. On MariaDB the hits are ranked by
+    # FULLTEXT score, so the best keyword match is not necessarily the first one
+    article = max(kb_articles, key=lambda a: a.get('relevance_score', 0), default=None)
+    if article and article.get('relevance_score', 0) >= 3:
+
+        # Update usage count in the background, once the chat is committed
+        frappe.enqueue(
+            "chatnext.chatnext.api.increment_kb_usage",
+            queue="short",
+            enqueue_after_commit=True,
+            article_name=article['name']
+        )
 
         answer = article.get('answer_urdu') if language == "Urdu" and article.get('answer_urdu') else article.get('answer')
 
         return {
             "answer": answer,
             "source": "Knowledge Base",
+            "source_reference": article['name'],
             "confidence": min(article['relevance_score'] * 30, 95),
-            "suggestions": [a.get('title') for a in kb_articles[1:]]
+            "suggestions": [a.get('title') for a in kb_articles if a is not article]
         }
 
     # Rule-based responses
@@ -393,6 +640,11 @@ def get_response(message, intent, session, language):
     return get_default_response(language)
 
 
+def _is_greeting(message):
+    """Check whether a message is only a greeting or small talk"""
+    return message.strip().strip("!?.,،۔ ").lower() in GREETINGS
+
+
 def get_rule_based_response(message, intent, session, language):
     """Get rule-based response based on intent"""
 
@@ -402,135 +654,107 @@ def get_rule_based_response(message, intent, session, language):
         if context_response:
             return context_response
 
-    # Intent-based responses
-    responses_en = {
-        "how_to": "To help you better, could you please specify which module or feature you need help with? For example: Sales, Purchase, HR, Inventory, etc.",
-        "what_is": "I can explain ERPNext concepts. Please specify what you'd like to know about.",
-        "create": "I can guide you on creating documents in ERPNext. Which document type would you like to create?",
-        "error": "I'd be happy to help troubleshoot. Could you please describe the error or issue in more detail?",
-        "find": "You can use the Awesome Bar (Ctrl+K) to search globally. What specifically are you looking for?",
-        "report": "ERPNext has many built-in reports. Which module's reports are you interested in?",
-        "setup": "I can help with ERPNext setup. Which area would you like to configure?"
-    }
-
-    responses_ur = {
-        "how_to": "آپ کی مدد کرنے کے لیے، براہ کرم بتائیں کہ آپ کو کس ماڈیول یا فیچر میں مدد چاہیے؟ مثال: Sales, Purchase, HR, Inventory",
-        "what_is": "میں ERPNext کے تصورات سمجھا سکتا ہوں۔ براہ کرم بتائیں آپ کیا جاننا چاہتے ہیں۔",
-        "create": "میں آپ کو ERPNext میں documents بنانے میں مدد کر سکتا ہوں۔ آپ کون سا document بنانا چاہتے ہیں؟",
-        "error": "میں مسئلہ حل کرنے میں مدد کروں گا۔ براہ کرم error یا issue کی تفصیل بتائیں۔",
-        "find": "آپ Awesome Bar (Ctrl+K) استعمال کر کے تلاش کر سکتے ہیں۔ آپ کیا ڈھونڈ رہے ہیں؟",
-        "report": "ERPNext میں بہت سی رپورٹس ہیں۔ آپ کو کس ماڈیول کی رپورٹس چاہیے؟",
-        "setup": "میں ERPNext setup میں مدد کر سکتا ہوں۔ آپ کیا configure کرنا چاہتے ہیں؟"
-    }
-
-    responses = responses_ur if language == "Urdu" else responses_en
-
-    if intent in responses:
-        return {
-            "answer": responses[intent],
-            "source": "Rule-Based",
-            "confidence": 70,
-            "suggestions": []
-        }
-
-    return None
+    replies = INTENT_REPLIES_UR if language == "Urdu" else INTENT_REPLIES_EN
+    return replies.get(intent)
 
 
 def get_context_response(doctype, message, language):
     """Get context-aware response based on current doctype"""
-
-    context_responses_en = {
-        "Sales Invoice": "I can help you with Sales Invoices. Common actions: Create new invoice, Check payment status, Print invoice, Submit invoice. What would you like to do?",
-        "Purchase Order": "I can help with Purchase Orders. You can: Create PO, Receive items, Check status, or Amend PO. What do you need?",
-        "Employee": "I can help with Employee records. You can: View attendance, Check leave balance, Update details, or Create salary slip. What would you like to know?",
-        "Stock Entry": "I can help with Stock Entries. Common operations: Material Transfer, Receipt, Issue, Manufacture. What do you need help with?",
-        "Customer": "I can help manage Customer records. You can: View history, Check outstanding, Create quotation, or Update details. What would you like to do?"
-    }
-
-    context_responses_ur = {
-        "Sales Invoice": "میں Sales Invoices میں مدد کر سکتا ہوں۔ عام کام: نیا invoice بنانا، payment status چیک کرنا، invoice print کرنا۔ آپ کیا کرنا چاہتے ہیں؟",
-        "Purchase Order": "میں Purchase Orders میں مدد کر سکتا ہوں۔ آپ کر سکتے ہیں: PO بنانا، items receive کرنا، status چیک کرنا۔ کیا چاہیے؟",
-        "Employee": "میں Employee records میں مدد کر سکتا ہوں۔ آپ دیکھ سکتے ہیں: Attendance، Leave balance، Details update کرنا۔ کیا جاننا چاہتے ہیں؟",
-        "Stock Entry": "میں Stock Entries میں مدد کر سکتا ہوں۔ عام operations: Material Transfer، Receipt، Issue، Manufacture۔ کیا مدد چاہیے؟",
-        "Customer": "میں Customer records manage کرنے میں مدد کروں گا۔ آپ کر سکتے ہیں: History دیکھنا، Outstanding چیک کرنا، Quotation بنانا۔"
-    }
-
-    responses = context_responses_ur if language == "Urdu" else context_responses_en
-
-    if doctype in responses:
-        return {
-            "answer": responses[doctype],
-            "source": "Context-Aware",
-            "confidence": 85,
-            "suggestions": []
-        }
-
-    return None
+    replies = CONTEXT_REPLIES_UR if language == "Urdu" else CONTEXT_REPLIES_EN
+    return replies.get(doctype)
 
 
 def get_default_response(language):
     """Get default response when no specific match found"""
-    if language == "Urdu":
-        return {
-            "answer": "میں آپ کی مدد کے لیے حاضر ہوں! براہ کرم اپنا سوال تفصیل سے پوچھیں۔ آپ مجھ سے ERPNext کے کسی بھی module کے بارے میں پوچھ سکتے ہیں: Sales, Purchase, Inventory, HR, Accounting, Manufacturing, وغیرہ۔",
-            "source": "Rule-Based",
-            "confidence": 50,
-            "suggestions": []
-        }
+    return DEFAULT_REPLY_UR if language == "Urdu" else DEFAULT_REPLY_EN
 
-    return {
-        "answer": "I'm here to help! Please ask your question in detail. You can ask me about any ERPNext module: Sales, Purchase, Inventory, HR, Accounting, Manufacturing, etc. How can I assist you today?",
-        "source": "Rule-Based",
-        "confidence": 50,
-        "suggestions": []
-    }
 
-
-def update_kb_stats(answer_text, rating):
+def update_kb_stats(article_name, rating):
     """Update knowledge base article statistics"""
     try:
-        # Find the article by answer text (simplified - could be improved)
-        articles = frappe.get_all(
-            "Knowledge Base Article",
-            filters=[["answer", "like", f"%{answer_text[:100]}%"]],
-            fields=["name", "helpful_count", "unhelpful_count"],
-            limit=1
-        )
-
-        if articles:
-            article = articles[0]
-            if rating == "Helpful":
-                frappe.db.set_value("Knowledge Base Article", article['name'],
-                                   "helpful_count", article.get('helpful_count', 0) + 1)
-            else:
-                frappe.db.set_value("Knowledge Base Article", article['name'],
-                                   "unhelpful_count", article.get('unhelpful_count', 0) + 1)
+        counter = "helpful_count" if rating == "Helpful" else "unhelpful_count"
+
+        # Increment in place - no lookup by answer text, no read-modify-write race
+        frappe.db.sql(f"""
+            UPDATE `tabKnowledge Base Article`
+            SET `{counter}` = COALESCE(`{counter}`, 0) + 1
+            WHERE name = %s
+        """, (article_name,))
     except Exception as e:
         frappe.log_error(f"KB Stats Update Error: {str(e)}")
 
 
+def increment_kb_usage(article_name):
+    """Count one more use of a knowledge base article (runs as a background job)"""
+    frappe.db.sql("""
+        UPDATE `tabKnowledge Base Article`
+        SET usage_count = COALESCE(usage_count, 0) + 1
+        WHERE name = %s
+    """, (article_name,))
+
+
+def get_active_rules(doctype=None):
+    """Load the active proactive rules that apply to a doctype, ordered by priority"""
+    doctype_condition = ""
+    if doctype:
+        doctype_condition = "AND (COALESCE(target_doctype, '') = '' OR target_doctype = %(doctype)s)"
+
+    return frappe.db.sql(f"""
+        SELECT name, rule_name, rule_type, target_doctype, `condition`,
+               suggestion_template, suggestion_template_urdu, priority
+        FROM `tabProactive Rule`
+        WHERE is_active = 1
+        {doctype_condition}
+        ORDER BY
+            CASE priority
+                WHEN 'Critical' THEN 0
+                WHEN 'High' THEN 1
+                WHEN 'Medium' THEN 2
+                WHEN 'Low' THEN 3
+                ELSE 4
+            END,
+            modified DESC
+    """, {"doctype": doctype}, as_dict=True)
+
+
 def check_rule_condition(rule, doctype=None, docname=None):
     """
     Check if a proactive rule condition is met
+    Conditions are site-wide aggregates, so the result is shared for RULE_CONDITION_CACHE_TTL seconds
+    """
+    cache_key = f"chatnext:rule_condition:{rule.rule_type}"
+    result = frappe.cache().get_value(cache_key)
+    if result is None:
+        result = evaluate_rule_condition(rule)
+        frappe.cache().set_value(cache_key, result, expires_in_sec=RULE_CONDITION_CACHE_TTL)
+
+    return result
+
+
+def evaluate_rule_condition(rule):
+    """
+    Evaluate a proactive rule condition against the database
     This is a simplified version - can be enhanced with actual condition execution
     """
     try:
         # Rule type based checking
         if rule.rule_type == "Low Stock Alert":
-            # Check for low stock items
+            # Check for low stock items - stop at the first one found
             low_stock = frappe.db.sql("""
-                SELECT COUNT(*) as count FROM `tabBin`
+                SELECT 1 FROM `tabBin`
                 WHERE actual_qty <= reorder_level AND reorder_level > 0
-            """, as_dict=True)
-            return low_stock[0].count > 0 if low_stock else False
+                LIMIT 1
+            """)
+            return bool(low_stock)
 
         elif rule.rule_type == "Overdue Invoice":
-            # Check for overdue invoices
+            # Check for overdue invoices - stop at the first one found
             overdue = frappe.db.sql("""
-                SELECT COUNT(*) as count FROM `tabSales Invoice`
+                SELECT 1 FROM `tabSales Invoice`
                 WHERE due_date < CURDATE() AND outstanding_amount > 0 AND docstatus = 1
-            """, as_dict=True)
-            return overdue[0].count > 0 if overdue else False
+                LIMIT 1
+            """)
+            return bool(overdue)
 
         # Add more rule type checks as needed
 
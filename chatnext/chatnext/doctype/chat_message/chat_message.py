@@ -1,9 +1,14 @@
 # Copyright (c) 2025, Umair Wali and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
 from frappe.model.document import Document
 
 
 class ChatMessage(Document):
 	pass
+
+
+def on_doctype_update():
+	# Session history is read per session in timestamp order
+	frappe.db.add_index("Chat Message", ["session", "timestamp"], "idx_chatmsg_session_ts")
@@ -27,5 +27,10 @@ class ChatnextSettings(Document):
             frappe.throw("Session Timeout must be between 5 and 240 minutes")
 
     def on_update(self):
-        """Clear cache when settings are updated"""
-        frappe.clear_cache()
+        """Clear Chatnext caches when settings are updated"""
+        from chatnext.chatnext.ai_engine import clear_settings_cache
+
+        clear_settings_cache()
+        # Only Chatnext's own keys (proactive rules, rule conditions, AI responses) -
+        # a site-wide frappe.clear_cache() would cold-start every other cache too
+        frappe.cache().delete_keys("chatnext:")
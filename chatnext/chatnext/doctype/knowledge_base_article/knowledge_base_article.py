@@ -1,9 +1,31 @@
 # Copyright (c) 2025, Umair Wali and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
 from frappe.model.document import Document
 
 
 class KnowledgeBaseArticle(Document):
 	pass
+
+
+def on_doctype_update():
+	# search_knowledge_base always filters on is_active, optionally on category/language
+	frappe.db.add_index("Knowledge Base Article", ["is_active", "category", "language"], "idx_kba_active_cat_lang")
+	add_fulltext_index()
+
+
+def add_fulltext_index():
+	"""Add the FULLTEXT index used to rank search results (MariaDB only)"""
+	if frappe.db.db_type != "mariadb":
+		return
+
+	if frappe.db.sql(
+		"SHOW INDEX FROM `tabKnowledge Base Article` WHERE Key_name = 'kb_fulltext_index'"
+	):
+		return
+
+	frappe.db.sql_ddl(
+		"ALTER TABLE `tabKnowledge Base Article` "
+		"ADD FULLTEXT INDEX kb_fulltext_index (title, question, keywords, answer)"
+	)
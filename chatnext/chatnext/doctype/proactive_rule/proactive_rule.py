@@ -1,9 +1,20 @@
 # Copyright (c) 2025, Umair Wali and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
 from frappe.model.document import Document
 
+PROACTIVE_RULES_CACHE_KEY = "chatnext:proactive_rules"
+
 
 class ProactiveRule(Document):
-	pass
+	def on_update(self):
+		clear_proactive_rules_cache()
+
+	def on_trash(self):
+		clear_proactive_rules_cache()
+
+
+def clear_proactive_rules_cache():
+	# Rules are cached once per context doctype under this prefix
+	frappe.cache().delete_keys(PROACTIVE_RULES_CACHE_KEY)
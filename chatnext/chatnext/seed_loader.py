@@ -0,0 +1,116 @@
+"""
+Shared loader for Chatnext seed records
+Used by the default knowledge base and proactive rule loaders
+"""
+
+from pathlib import Path
+
+import frappe
+
+# tqdm is optional - used for a coalesced progress bar when records are inserted one at a time
+try:
+    from tqdm import tqdm
+    TQDM_AVAILABLE = True
+except ImportError:
+    TQDM_AVAILABLE = False
+
+# Seed records are kept as JSON so importing the loaders doesn't compile them
+DATA_DIR = Path(__file__).parent / "data"
+
+AUDIT_COLUMNS = ("creation", "modified", "owner", "modified_by", "docstatus")
+
+def load_seed_records(doctype, records, name_field, columns):
+    """Insert the seed records that aren't loaded yet; returns (created_count, skipped_count)"""
+
+    # Per-record progress goes to the log; the caller prints only the totals
+    logger = frappe.logger("chatnext")
+
+    # Names come from name_field, so one query tells which ones are already loaded.
+    # Only the seed names are looked up, not every record on the site
+    existing = set(frappe.get_all(
+        doctype,
+        filters={"name": ["in", [d[name_field] for d in records]]},
+        pluck="name"
+    )) if records else set()
+
+    skipped_count = 0
+    new_records = []
+
+    for data in records:
+        # Check if already exists
+        if data[name_field] in existing:
+            logger.info(f"{doctype} {data[name_field]} already exists, skipping")
+            skipped_count += 1
+            continue
+
+        existing.add(data[name_field])
+        new_records.append(data)
+
+    created_count = 0
+    try:
+        if frappe.db.db_type == "postgres":
+            # Seed data is simply reloaded after a crash, so the commit needn't wait for the WAL flush.
+            # SET LOCAL lasts until this transaction ends
+            frappe.db.sql("SET LOCAL synchronous_commit = OFF")
+
+        now = frappe.utils.now()
+        fields = ["name", *AUDIT_COLUMNS, *columns]
+        rows = build_rows(new_records, name_field, columns, now)
+
+        # Static seed data needs no Document, validation or hooks: insert raw rows with multi-row INSERTs.
+        # ignore_duplicates makes the database skip existing keys, so a record created by
+        # a concurrent run after the prefetch is skipped instead of failing the whole batch
+        frappe.db.savepoint("seed_records")
+        try:
+            frappe.db.bulk_insert(doctype, fields, rows, chunk_size=500, ignore_duplicates=True)
+        except Exception:
+            # One bad record fails the whole statement: undo only that, then insert row by row
+            frappe.db.rollback(save_point="seed_records")
+            insert_rows_individually(doctype, fields, rows, logger)
+
+        # Rows skipped as duplicates or failed aren't reported by bulk_insert, so count what is
+        # actually there: only this run's rows carry its creation timestamp
+        created = set(frappe.get_all(
+            doctype,
+            filters={"name": ["in", [d[name_field] for d in new_records]], "creation": now},
+            pluck="name"
+        )) if new_records else set()
+
+        frappe.db.commit()
+
+        for data in new_records:
+            if data[name_field] in created:
+                logger.info(f"Created {doctype} {data[name_field]}")
+            else:
+                logger.info(f"{doctype} {data[name_field]} not inserted, skipping")
+        created_count = len(created)
+        skipped_count += len(new_records) - created_count
+
+    except Exception as e:
+        logger.exception(f"Error creating {doctype} records")
+        print(f"❌ Error creating {doctype} records: {str(e)}")
+        frappe.db.rollback()
+
+    return created_count, skipped_count
+
+def build_rows(records, name_field, columns, now):
+    """Return raw row tuples for seed records: name, audit columns, then the record's own columns"""
+    user = frappe.session.user
+    return [
+        (data[name_field], now, now, user, user, 0, *(data[column] for column in columns))
+        for data in records
+    ]
+
+def insert_rows_individually(doctype, fields, rows, logger):
+    """Insert rows one at a time behind savepoints, keeping the good ones"""
+    if TQDM_AVAILABLE:
+        rows = tqdm(rows, desc=doctype, mininterval=0.5)
+
+    for i, row in enumerate(rows):
+        save_point = f"seed_row_{i}"
+        frappe.db.savepoint(save_point)
+        try:
+            frappe.db.bulk_insert(doctype, fields, [row], ignore_duplicates=True)
+        except Exception:
+            frappe.db.rollback(save_point=save_point)
+            logger.exception(f"Error creating {doctype} {row[0]}")
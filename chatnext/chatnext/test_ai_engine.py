@@ -0,0 +1,28 @@
+# Copyright (c) 2025, Umair Wali and Contributors
+# See license.txt
+
+from frappe.tests.utils import FrappeTestCase
+
+from chatnext.chatnext.ai_engine import remove_markdown_formatting
+
+
+class TestRemoveMarkdownFormatting(FrappeTestCase):
+	def test_stacked_line_prefixes(self):
+		self.assertEqual(remove_markdown_formatting("### 1. Create a Customer"), "Create a Customer")
+		self.assertEqual(remove_markdown_formatting("## 2. Add Items"), "Add Items")
+		self.assertEqual(remove_markdown_formatting("- 1. nested"), "nested")
+		self.assertEqual(remove_markdown_formatting("  * item\n  2. step"), "item\nstep")
+
+	def test_emphasis(self):
+		self.assertEqual(remove_markdown_formatting("***Important***"), "Important")
+		self.assertEqual(remove_markdown_formatting("___Important___"), "Important")
+		self.assertEqual(remove_markdown_formatting("**bold** and *italic*"), "bold and italic")
+
+	def test_code_links_and_rules(self):
+		self.assertEqual(remove_markdown_formatting("Run `bench migrate`"), "Run bench migrate")
+		self.assertEqual(remove_markdown_formatting("See [the docs](https://docs.erpnext.com)"), "See the docs")
+		self.assertEqual(remove_markdown_formatting("---\nText\n\n\n\nMore"), "Text\n\nMore")
+
+	def test_plain_text_unchanged(self):
+		self.assertEqual(remove_markdown_formatting("  Plain text here.  "), "Plain text here.")
+		self.assertEqual(remove_markdown_formatting(""), "")
@@ -0,0 +1,15 @@
+# Copyright (c) 2025, Umair Wali and Contributors
+# See license.txt
+
+from frappe.tests.utils import FrappeTestCase
+
+from chatnext.chatnext.api import query
+
+
+class TestQuery(FrappeTestCase):
+	def test_unknown_session_returns_error(self):
+		result = query("How do I create a Sales Invoice?", session_id="CHAT-DOES-NOT-EXIST")
+
+		self.assertFalse(result["success"])
+		self.assertIn("CHAT-DOES-NOT-EXIST", result["error"])
+		self.assertEqual(result["answer"], "Sorry, I encountered an error. Please try again.")
@@ -3,16 +3,29 @@ Chatnext Workspace Configuration
 Creates a dedicated workspace for Chatnext with all related doctypes and tools
 """
 
-from frappe import _
+from functools import lru_cache
+from types import MappingProxyType
 
 
 def get_data():
+    # Imported here so tools that only inspect this module don't pull in frappe
+    import frappe
+
+    return _get_data_for_language(frappe.local.lang)
+
+
+@lru_cache(maxsize=32)
+def _get_data_for_language(lang):
+    """Build the workspace config once per language; labels are translated into `lang`"""
+    from frappe import _
+
     return {
         "Chatnext": {
             "icon": "fa fa-comments",
             "color": "#667eea",
             "label": _("Chatnext"),
-            "items": [
+            # Read-only items, shared by every caller of the cached config
+            "items": tuple(MappingProxyType(item) for item in (
                 {
                     "type": "doctype",
                     "name": "Chat Session",
@@ -49,6 +62,6 @@ def get_data():
                     "label": _("Settings"),
                     "description": _("Configure AI and general settings")
                 }
-            ]
+            ))
         }
     }
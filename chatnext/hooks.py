@@ -83,7 +83,7 @@ app_include_js = "/assets/chatnext/js/chatnext_widget.js?v=3"
 # ------------
 
 # before_install = "chatnext.install.before_install"
-# after_install = "chatnext.install.after_install"
+after_install = "chatnext.install.after_install"
 
 # Uninstallation
 # ------------
@@ -196,7 +196,8 @@ app_include_js = "/assets/chatnext/js/chatnext_widget.js?v=3"
 
 # Request Events
 # ----------------
-# before_request = ["chatnext.utils.before_request"]
+# Loads the local AI model (and pays its torch.compile warm-up) before the first question
+before_request = ["chatnext.chatnext.ai_engine.preload_model_in_background"]
 # after_request = ["chatnext.utils.after_request"]
 
 # Job Events
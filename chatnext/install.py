@@ -0,0 +1,18 @@
+import frappe
+
+
+def after_install():
+	add_erpnext_indexes()
+
+
+def add_erpnext_indexes():
+	"""Index the ERPNext tables scanned by proactive rule conditions, if ERPNext is installed"""
+	if frappe.db.table_exists("Bin"):
+		# Low Stock Alert: reorder_level > 0 AND actual_qty <= reorder_level
+		frappe.db.add_index("Bin", ["reorder_level", "actual_qty"], "idx_bin_reorder")
+
+	if frappe.db.table_exists("Sales Invoice"):
+		# Overdue Invoice: docstatus = 1 AND due_date < today AND outstanding_amount > 0
+		frappe.db.add_index(
+			"Sales Invoice", ["docstatus", "due_date", "outstanding_amount"], "idx_sinv_overdue"
+		)
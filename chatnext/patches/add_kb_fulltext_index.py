@@ -0,0 +1,5 @@
+from chatnext.chatnext.doctype.knowledge_base_article.knowledge_base_article import add_fulltext_index
+
+
+def execute():
+	add_fulltext_index()
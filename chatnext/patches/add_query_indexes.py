@@ -0,0 +1,13 @@
+from chatnext.chatnext.doctype.chat_message.chat_message import (
+	on_doctype_update as add_chat_message_indexes,
+)
+from chatnext.chatnext.doctype.knowledge_base_article.knowledge_base_article import (
+	on_doctype_update as add_knowledge_base_indexes,
+)
+from chatnext.install import add_erpnext_indexes
+
+
+def execute():
+	add_chat_message_indexes()
+	add_knowledge_base_indexes()
+	add_erpnext_indexes()